@@ -27,8 +27,8 @@ def prompt_for_hash(mode, commit_hashes):
         instructions = "There are multiple children:"
         prompt = "Enter the child index"
 
-    commit_descriptions = [gitutils.summarize_git_commit(commit_hash, "%h %s")
-                           for commit_hash in commit_hashes]
+    commit_descriptions = gitutils.summarize_git_commits(commit_hashes,
+                                                         "%h %s")
 
     selected_index \
         = gitutils.prompt_with_numbered_choices(commit_descriptions,
@@ -65,17 +65,12 @@ def main(mode, description, argv):
     gitutils.verbose = opts.verbose
     attach = gitutils.get_option(opts, "attach", handler=bool, default=False)
 
-    # Called for the side-effect of verifying that we're in a git repository.
-    gitutils.git_root()
+    gitutils.expect_git_repository()
 
-    commit_graph = gitutils.git_commit_graph()
     head_hash = gitutils.git_commit_hash("HEAD")
-    head_node = commit_graph.get(head_hash)
-
-    target_nodes = (head_node.parents
-                    if mode == Mode.PREV
-                    else head_node.children)
-    target_hashes = [node.commit_hash for node in target_nodes]
+    target_hashes = (gitutils.git_parents(head_hash)
+                     if mode == Mode.PREV
+                     else gitutils.git_children(head_hash))
     if not target_hashes:
         head_hash_short = gitutils.git_commit_hash(head_hash, short=True)
         message = (f"Could not find a parent commit for {head_hash_short}"
@@ -100,4 +95,4 @@ def main(mode, description, argv):
         command.append(selected_branch)
     else:
         command += ["--detach", selected_hash]
-    return gitutils.run_command(command).returncode
+    return gitutils.exec_command(command)
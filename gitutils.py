@@ -2,20 +2,24 @@
 
 import dataclasses
 import functools
-import importlib
-import importlib.machinery
-import importlib.util
 import os
+import re
 import shlex
 import subprocess
 import sys
-import typing
 
 import python_cli_utils.choices_prompt
 import python_cli_utils.tty_utils
 
 verbose = False
 
+# Maps each `extensions.objectFormat` value to a regular expression that
+# matches a full commit hash as printed by `git`.
+_full_commit_hash_res = {
+    "sha1": re.compile(r"[0-9a-f]{40}"),
+    "sha256": re.compile(r"[0-9a-f]{64}"),
+}
+
 
 class AbortError(Exception):
     """
@@ -218,6 +222,8 @@ def quoted_join(iterable):
 
 class GraphNode:
     """A node in the Git commit graph."""
+    __slots__ = ("commit_hash", "parents", "children")
+
     def __init__(self, commit_hash):
         self.commit_hash = commit_hash
         self.parents = []
@@ -227,7 +233,7 @@ class GraphNode:
         """Adds a list of `GraphNodes` as children of this one."""
         for child in children:
             child.parents.append(self)
-        self.children += children
+        self.children.extend(children)
 
     def __repr__(self):
         return f"GraphNode('{self.commit_hash}')"
@@ -240,7 +246,7 @@ def debug_print(message):
     `message` may be string or a zero-argument function that returns a string.
     """
     if verbose:
-        if message is callable:
+        if callable(message):
             message = message()
         print(message, file=sys.stderr)
 
@@ -261,9 +267,14 @@ def entrypoint(main):
 
     Used to reduce boilerplate.
     """
+    # Note that the module might not be in `sys.modules` yet (e.g. when loaded
+    # via `import_file`), so get its filename from `main`'s globals instead.
+    script_name = os.path.basename(main.__globals__["__file__"])
+
     @functools.wraps(main)
     def wrapper(*args, **kwargs):
-        script_name = os.path.basename(sys.modules[main.__module__].__file__)
+        # This can't be done when decorating since it would break the
+        # `if __name__ == "__main__"` check in the script.
         sys.modules[main.__module__].__name__ = script_name
 
         try:
@@ -294,6 +305,9 @@ def import_file(file_path, module_name=None):
 
     If `module_name` is not specified, the module name will be derived from
     the filename, replacing any `-` characters with `_`s.
+
+    If the same file already has been imported with the same module name,
+    returns the existing module.
     """
     # Derived from: <https://stackoverflow.com/a/56090741/>.
     if not module_name:
@@ -301,6 +315,15 @@ def import_file(file_path, module_name=None):
         module_name = stem.replace("-", "_")
 
     file_path = os.path.abspath(file_path)
+    module = sys.modules.get(module_name)
+    if module and getattr(module, "__file__", None) == file_path:
+        return module
+
+    # Imported lazily since the scripts themselves do not need it.
+    # pylint: disable=import-outside-toplevel
+    import importlib.machinery
+    import importlib.util
+
     loader = importlib.machinery.SourceFileLoader(module_name, file_path)
     spec = importlib.util.spec_from_loader(module_name, loader)
     module = importlib.util.module_from_spec(spec)
@@ -316,22 +339,20 @@ def import_file(file_path, module_name=None):
     return module
 
 
-def run_command(args, **kwargs):
+def _log_command(args, kwargs):
     """
-    A wrapper around `subprocess.run` that prints the executed command-line for
-    debugging.  Additionally can print error messages that would normally be
+    Prints the specified command-line if `verbose` mode is enabled.  Also
+    modifies `kwargs` to unsuppress error messages that would normally be
     suppressed.
 
-    The `CompletedProcess` object stores the executed command-line, but
-    printing the command-line first can help debug issues where the executed
-    process never completes.
+    Common code for `run_command`, `stream_command`, and `exec_command`.
     """
     assert args
 
     if verbose:
         # We must flush to ensure that we print before the executed command
         # prints.
-        print(args, file=sys.stderr, flush=True)
+        print(quoted_join(args), file=sys.stderr, flush=True)
 
         if kwargs.get("stderr") == subprocess.DEVNULL:
             # Unsuppress error messages.
@@ -342,10 +363,62 @@ def run_command(args, **kwargs):
         # enabled only in debugging scenarios, we're more likely to be
         # interested in error messages.
 
+
+def run_command(args, **kwargs):
+    """
+    A wrapper around `subprocess.run` that prints the executed command-line for
+    debugging.  Additionally can print error messages that would normally be
+    suppressed.
+
+    The `CompletedProcess` object stores the executed command-line, but
+    printing the command-line first can help debug issues where the executed
+    process never completes.
+    """
+    _log_command(args, kwargs)
+
     # pylint: disable=subprocess-run-check
     return subprocess.run(args, **kwargs)
 
 
+def stream_command(args, **kwargs):
+    """
+    A wrapper around `subprocess.Popen` that yields each line of output from
+    the executed command as it is read.  Prints the executed command-line for
+    debugging in the same manner as `run_command`.
+
+    Unlike calling `run_command` with `stdout=subprocess.PIPE`, avoids holding
+    the command's entire output in memory at once.
+
+    Raises a `subprocess.CalledProcessError` if the command fails.
+    """
+    _log_command(args, kwargs)
+
+    with subprocess.Popen(args, stdout=subprocess.PIPE, **kwargs) as process:
+        yield from process.stdout
+
+    if process.returncode != 0:
+        raise subprocess.CalledProcessError(process.returncode, args)
+
+
+def exec_command(args):
+    """
+    Replaces the current process with the specified command.  Prints the
+    executed command-line for debugging in the same manner as `run_command`.
+
+    Intended for the final command executed by a script, which otherwise would
+    spawn a child process just to wait for it and to return its exit code.  On
+    platforms that do not support replacing the current process, instead runs
+    the command via `run_command` and returns its exit code.
+    """
+    if os.name == "posix":
+        _log_command(args, {})
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os.execvp(args[0], args)
+
+    return run_command(args).returncode
+
+
 def run_editor(file_path, line_number=None):
     """
     Open the specified file in an editor at the specified line number, if
@@ -381,9 +454,8 @@ def remove_prefix(s, *, prefix, default=None):
 
     Returns `default` if the string does not start with the prefix.
     """
-    # Consider replacing with `str.removeprefix` in Python 3.9+.
     if s and s.startswith(prefix):
-        return s[len(prefix):]
+        return s.removeprefix(prefix)
     return default
 
 
@@ -409,6 +481,8 @@ def prompt_with_numbered_choices(choices,
     max_length = python_cli_utils.terminal_size().columns - 1
 
     def item_formatter(s):
+        if len(s) <= max_length:
+            return s
         return python_cli_utils.ellipsize(s, width=max_length)
 
     return python_cli_utils.numbered_choices_prompt(
@@ -442,6 +516,72 @@ def prompt_for_branch(local_branches, commitish):
     return local_branches[selected_index]
 
 
+def _normalize_git_config_name(qualified_name):
+    """
+    Normalizes an option name to the form printed by `git config --list`.
+    Section and variable names are case-insensitive; subsection names are not.
+    """
+    (section, _, rest) = qualified_name.partition(".")
+    (subsection, dot, variable_name) = rest.rpartition(".")
+    return f"{section.lower()}.{subsection}{dot}{variable_name.lower()}"
+
+
+@functools.lru_cache(1)
+def _git_config_snapshot():
+    """
+    Reads all Git configuration options with one `git config --list` call.
+
+    Returns a dictionary mapping each normalized option name to its value (or
+    to `None` if it has no value).  The last value wins, as with `git config`.
+    The result is memoized until `invalidate_git_config_cache` is called.
+    """
+    result = run_command(("git", "config", "--list", "-z"),
+                         stdout=subprocess.PIPE)
+    if result.returncode != 0:
+        raise AbortError("Failed to retrieve config options.",
+                         exit_code=result.returncode)
+
+    # Values are not necessarily valid UTF-8 (e.g. a Latin-1 `user.name`).
+    config = {}
+    for record in result.stdout.decode(errors="surrogateescape").split("\0"):
+        if not record:
+            continue
+        (name, newline, value) = record.partition("\n")
+        config[name] = value if newline else None
+    return config
+
+
+def invalidate_git_config_cache():
+    """
+    Discards the Git configuration options cached by `get_git_config`.
+
+    Callers that modify the Git configuration must call this for subsequent
+    calls to `get_git_config` to observe the changes.
+    """
+    _git_config_snapshot.cache_clear()
+
+
+def _parse_git_bool(qualified_name, value_string):
+    """
+    Parses a Git configuration value as `git config --type=bool` does.  Raises
+    an `AbortError` if the value is not a valid boolean.
+    """
+    if value_string is None:
+        # An option specified without a value is implicitly true.
+        return True
+
+    normalized = value_string.lower()
+    if normalized in ("true", "yes", "on"):
+        return True
+    if normalized in ("false", "no", "off", ""):
+        return False
+    try:
+        return int(normalized, 10) != 0
+    except ValueError:
+        raise AbortError(f"Bad boolean config value \"{value_string}\" for "
+                         f"{qualified_name}") from None
+
+
 def get_git_config(section, variable_name, handler=None, default=None):
     """
     Retrieves a Git configuration option.
@@ -452,24 +592,19 @@ def get_git_config(section, variable_name, handler=None, default=None):
     If the configuration option is not present, `default` will be returned.
     """
     qualified_name = f"{section}.{variable_name}"
-    options = []
-    if handler is bool:
-        options.append("--type=bool")
-    result = run_command(("git", "config", *options, qualified_name),
-                         stdout=subprocess.PIPE,
-                         universal_newlines=True)
-    if result.returncode == 0:
-        value_string = result.stdout.rstrip("\n")
-        if not handler:
-            return value_string
-        if handler is bool:
-            return value_string == "true"
-        return handler(value_string)
-    if result.returncode == 1:
+    config = _git_config_snapshot()
+    try:
+        value_string = config[_normalize_git_config_name(qualified_name)]
+    except KeyError:
         return default
 
-    raise AbortError(f"Failed to retrieve config option: {qualified_name}"
-                     f"{result.returncode}")
+    if handler is bool:
+        return _parse_git_bool(qualified_name, value_string)
+
+    value_string = value_string or ""
+    if not handler:
+        return value_string
+    return handler(value_string)
 
 
 def get_option(opts, variable_name, *, handler=None, default=None):
@@ -502,6 +637,18 @@ def git_extension_command_name(extension_name=None):
     return remove_prefix(extension_name, prefix="git-", default=extension_name)
 
 
+def _is_full_commit_hash(s):
+    """Returns whether `s` is a full commit hash in the current repository."""
+    # Avoid reading the configuration for other commit-ishes.
+    if len(s) not in (40, 64):
+        return False
+
+    object_format = get_git_config("extensions", "objectformat",
+                                   default="sha1")
+    regexp = _full_commit_hash_res.get(object_format.lower())
+    return regexp is not None and regexp.fullmatch(s) is not None
+
+
 def git_commit_hash(commitish, short=False):
     """
     Normalizes a commit-ish to an actual commit hash to handle things such as
@@ -511,6 +658,11 @@ def git_commit_hash(commitish, short=False):
     """
     assert commitish
 
+    # `git rev-parse --verify` returns a full commit hash unchanged without
+    # checking that the commit exists, so avoid executing `git` for it.
+    if not short and _is_full_commit_hash(commitish):
+        return commitish
+
     extra_options = []
     if short:
         extra_options.append("--short")
@@ -520,7 +672,7 @@ def git_commit_hash(commitish, short=False):
                           "--end-of-options", commitish, "--"),
                          stdout=subprocess.PIPE,
                          stderr=subprocess.DEVNULL,
-                         universal_newlines=True)
+                         encoding="utf-8")
     if result.returncode != 0:
         raise CommitNotFoundError(commitish, exit_code=result.returncode)
 
@@ -545,7 +697,7 @@ def summarize_git_commit(commitish, format=None):  # pylint: disable=redefined-b
                           commitish),
                          stdout=subprocess.PIPE,
                          stderr=subprocess.DEVNULL,
-                         universal_newlines=True)
+                         encoding="utf-8")
     if result.returncode != 0:
         raise AbortError(f"Failed to summarize \"{commitish}\".",
                          exit_code=result.returncode)
@@ -553,6 +705,45 @@ def summarize_git_commit(commitish, format=None):  # pylint: disable=redefined-b
     return result.stdout.rstrip()
 
 
+def summarize_git_commits(  # pylint: disable=redefined-builtin
+        commit_hashes, format=None):
+    """
+    Like `summarize_git_commit`, but summarizes multiple commits with a single
+    invocation of `git log`.
+
+    `commit_hashes` must be a sequence of full commit hashes.  Returns a list
+    of summaries in the same order.
+    """
+    assert commit_hashes
+
+    format = format or "%h %s"
+
+    # Prefix each summary with its full commit hash to match it to the request
+    # even if `git log` omits duplicates.  `--no-show-signature` keeps
+    # `log.showSignature` from inserting signature text before the hash.
+    result = run_command(("git", "log", "--no-walk=unsorted", "-z",
+                          "--no-show-signature", f"--format=%H%x1f{format}",
+                          *commit_hashes, "--"),
+                         stdout=subprocess.PIPE,
+                         stderr=subprocess.DEVNULL,
+                         encoding="utf-8")
+    if result.returncode != 0:
+        raise AbortError(f"Failed to summarize commits: "
+                         f"{quoted_join(commit_hashes)}",
+                         exit_code=result.returncode)
+
+    summaries = {}
+    for record in result.stdout.split("\0"):
+        if record:
+            (commit_hash, _, summary) = record.partition("\x1f")
+            summaries[commit_hash] = summary.rstrip()
+
+    try:
+        return [summaries[commit_hash] for commit_hash in commit_hashes]
+    except KeyError as e:
+        raise AbortError(f"Failed to summarize \"{e.args[0]}\".") from None
+
+
 def is_git_ancestor(parent_commitish, child_commitish):
     """
     Returns whether `parent_commitish` is a parent commit of (or is the same
@@ -561,6 +752,11 @@ def is_git_ancestor(parent_commitish, child_commitish):
     assert parent_commitish
     assert child_commitish
 
+    # Avoid executing `git` for the trivial case.  Note that this does not
+    # verify that the commit-ish is valid.
+    if parent_commitish == child_commitish:
+        return True
+
     result = run_command(("git", "merge-base", "--is-ancestor",
                           parent_commitish, child_commitish))
 
@@ -591,71 +787,144 @@ def git_status(*paths, untracked_files="no"):
                           f"--untracked-files={untracked_files}",
                           "--", *paths),
                          stdout=subprocess.PIPE,
-                         encoding="utf-8",
                          check=True)
-    tokens = result.stdout.split("\0")
-    if tokens and tokens[-1] == "":
+
+    # Read the output as bytes since file paths are not necessarily valid
+    # UTF-8.
+    tokens = result.stdout.split(b"\0")
+    if tokens and tokens[-1] == b"":
         tokens.pop()
 
+    # `git status --porcelain` returns paths relative to the root of the
+    # current git repository, not relative to the current working directory.
+    cwd = os.getcwd()
+    if cwd == root:
+        # Avoid the extra work done by `os.path.relpath` in the common case.
+        # (Normalization still is needed to strip trailing slashes from
+        # untracked directories.)
+        to_relative_path = os.path.normpath
+    else:
+        def to_relative_path(path):
+            return os.path.relpath(os.path.join(root, path), cwd)
+
     status_dict = {}
 
     tokens_iter = iter(tokens)
-    try:
-        while True:
-            token = next(tokens_iter)
+    for token in tokens_iter:
+        if len(token) <= 2 or token[2:3] != b" ":
+            raise AbortError(f"Unexpected token: {os.fsdecode(token)}")
+        code = token[0:2].decode("ascii")
+
+        (code_index, code_working_tree) = code
+
+        file_path = to_relative_path(os.fsdecode(token[3:]))
+        original_file_path = file_path
+
+        if ("R" in code) or ("C" in code):
+            original_file_path = next(tokens_iter, None)
+            if original_file_path is None:
+                raise AbortError(f"Missing original path for: "
+                                 f"{os.fsdecode(token)}")
+            original_file_path = to_relative_path(
+                os.fsdecode(original_file_path))
+        status_dict[file_path] = GitStatusFileInfo(
+            code_index=code_index,
+            code_working_tree=code_working_tree,
+            file_path=file_path,
+            original_file_path=original_file_path,
+        )
 
-            if len(token) <= 2 or token[2] != " ":
-                raise AbortError(f"Unexpected token: {token}")
-            code = token[0:2]
+    return status_dict
 
-            (code_index, code_working_tree) = code
 
-            # `git status --porcelain` returns paths relative to the root of
-            # the current git repository, not relative to the current working
-            # directory.
-            file_path = token[3:]
-            file_path = os.path.relpath(os.path.join(root, file_path))
+def git_parents(commitish):
+    """
+    Returns a list of commit hashes for the immediate parents of the specified
+    commit-ish, in order.
 
-            original_file_path = file_path
+    Raises a `CommitNotFoundError` if the commit-ish could not be found.
+    """
+    assert commitish
 
-            if ("R" in code) or ("C" in code):
-                original_file_path = next(tokens_iter)
-                original_file_path = os.path.relpath(
-                    os.path.join(root, original_file_path))
-            status_dict[file_path] = GitStatusFileInfo(
-                code_index=code_index,
-                code_working_tree=code_working_tree,
-                file_path=file_path,
-                original_file_path=original_file_path,
-            )
+    # Use `git rev-parse` instead of `git log --format=%P`, which would include
+    # signature text in its output if `log.showSignature` is enabled.
+    result = run_command(("git", "rev-parse", "--end-of-options",
+                          f"{commitish}^@"),
+                         stdout=subprocess.PIPE,
+                         stderr=subprocess.DEVNULL,
+                         encoding="utf-8")
+    if result.returncode != 0:
+        raise CommitNotFoundError(commitish, exit_code=result.returncode)
 
-    except StopIteration:
-        pass
+    # Some versions of `git rev-parse` echo `--end-of-options`.
+    return [t for t in result.stdout.split() if t != "--end-of-options"]
 
-    return status_dict
+
+def git_children(commit_hash):
+    """
+    Returns a list of commit hashes for the immediate children of the
+    specified commit hash.
+
+    `commit_hash` must be a full commit hash (e.g. as returned by
+    `git_commit_hash`).  Only children that are reachable from a named
+    reference or from `HEAD` will be found.
+    """
+    assert commit_hash
+
+    # Only walk the descendants of the specified commit instead of the entire
+    # commit graph.
+    lines = stream_command(("git", "rev-list", "--parents", "--ancestry-path",
+                            "--all", f"^{commit_hash}", "--"),
+                           encoding="utf-8")
+
+    children_hashes = []
+    for line in lines:
+        (child_hash, *parent_hashes) = line.split()
+        if commit_hash in parent_hashes:
+            children_hashes.append(child_hash)
+
+    # Match `git rev-list --children`, which lists children in the reverse of
+    # their output order.
+    children_hashes.reverse()
+    return children_hashes
 
 
 def git_commit_graph():
     """
     Returns a dictionary mapping each Git commit hash to a list of commit
     hashes for its immediate children.
+
+    This walks the entire commit history of the repository.  Callers that
+    need only the immediate neighbors of a single commit should use
+    `git_parents` or `git_children` instead.
     """
-    result = run_command(("git", "rev-list", "--children", "--all"),
-                         stdout=subprocess.PIPE,
-                         check=True,
-                         universal_newlines=True)
+    # Read the output as bytes; it consists solely of hexadecimal commit
+    # hashes, so decoding it as ASCII is cheaper than doing so with the locale
+    # encoding and with universal newline translation.
+    lines = stream_command(("git", "rev-list", "--parents", "--all"))
     commit_graph = {}
 
-    # `git rev-list` normally orders later commits on top.  Parse the output
-    # bottom-up to try to preserve parent order to avoid making a separate
-    # invocation of `git rev-list --parents --all`.
-    for line in reversed(result.stdout.splitlines()):
-        (parent_hash, *children_hashes) = line.split()
-        parent_node = commit_graph.setdefault(parent_hash,
-                                              GraphNode(parent_hash))
-        parent_node.add_children(
-            [commit_graph.setdefault(child_hash, GraphNode(child_hash))
-             for child_hash in children_hashes])
+    def get_node(commit_hash):
+        # Avoid `dict.setdefault`, which would construct a throwaway
+        # `GraphNode` for every commit hash that is already in the graph.
+        node = commit_graph.get(commit_hash)
+        if node is None:
+            node = commit_graph[commit_hash] = GraphNode(commit_hash)
+        return node
+
+    # Use `--parents` instead of `--children` so that each commit's parents
+    # are listed in their actual order.
+    for line in lines:
+        (child_hash, *parent_hashes) = line.decode("ascii").split()
+        child_node = get_node(child_hash)
+        for parent_hash in parent_hashes:
+            parent_node = get_node(parent_hash)
+            child_node.parents.append(parent_node)
+            parent_node.children.append(child_node)
+
+    # As in `git_children`, list children in `git rev-list --children` order.
+    for node in commit_graph.values():
+        node.children.reverse()
     return commit_graph
 
 
@@ -667,7 +936,7 @@ def current_git_branch():
     # Reference: <https://stackoverflow.com/questions/6245570/>
     result = run_command(("git", "rev-parse", "--abbrev-ref", "HEAD"),
                          stdout=subprocess.PIPE,
-                         universal_newlines=True)
+                         encoding="utf-8")
     if result.returncode != 0:
         raise AbortError("Failed to determine the current git branch.",
                          exit_code=result.returncode)
@@ -679,12 +948,6 @@ def git_names_for(commitish, local_branches=True, remote_branches=False,
                   tags=False):
     """Returns a list of named references for the specified commit-ish."""
     # TODO: Add option to return `HEAD`?
-    result = run_command(("git", "for-each-ref", f"--points-at={commitish}"),
-                         stdout=subprocess.PIPE,
-                         universal_newlines=True,
-                         check=True)
-    lines = result.stdout.splitlines()
-
     prefixes = []
     if local_branches:
         prefixes.append("refs/heads/")
@@ -695,18 +958,21 @@ def git_names_for(commitish, local_branches=True, remote_branches=False,
     if not prefixes:
         return []
 
-    names = []
-    for line in lines:
-        (_commit_hash, ref_type, name) = line.split(maxsplit=2)
-        if ref_type != "commit":
-            continue
-
-        for prefix in prefixes:
-            commitish = remove_prefix(name, prefix=prefix)
-            if commitish:
-                names.append(commitish)
-                break
+    # Let `git for-each-ref` filter the references by type instead of listing
+    # every reference that points to the commit.  Since every prefix has
+    # exactly two components, `lstrip=2` also makes `git` strip them for us.
+    result = run_command(("git", "for-each-ref", f"--points-at={commitish}",
+                          "--format=%(objecttype) %(refname:lstrip=2)",
+                          *prefixes),
+                         stdout=subprocess.PIPE,
+                         encoding="utf-8",
+                         check=True)
 
+    names = []
+    for line in result.stdout.splitlines():
+        (ref_type, _, name) = line.partition(" ")
+        if ref_type == "commit":
+            names.append(name)
     return names
 
 
@@ -714,9 +980,19 @@ def git_root():
     """Returns the absolute path to the root of the current Git repository."""
     result = run_command(("git", "rev-parse", "--show-toplevel"),
                          stdout=subprocess.PIPE,
-                         universal_newlines=True)
+                         encoding="utf-8")
     if result.returncode != 0:
         raise AbortError("Failed to determine the current git repository.",
                          exit_code=result.returncode)
 
     return result.stdout.rstrip("\n")
+
+
+def expect_git_repository():
+    """Raises an `AbortError` if not inside a Git repository."""
+    # This is cheaper than `git_root`, and the output is not needed.
+    result = run_command(("git", "rev-parse", "--git-dir"),
+                         stdout=subprocess.DEVNULL)
+    if result.returncode != 0:
+        raise AbortError("Failed to determine the current git repository.",
+                         exit_code=result.returncode)
@@ -94,6 +94,17 @@ class FakeRunCommand:
                                            stdout=result.stdout,
                                            stderr=result.stderr)
 
+    def stream(self, *args, **kwargs):
+        """A fake replacement for `gitutils.stream_command`."""
+        result = self(*args, **kwargs)
+        if result.returncode != 0:
+            raise subprocess.CalledProcessError(result.returncode, args[0])
+        lines = (result.stdout or "").splitlines(keepends=True)
+        if not any(kwargs.get(key)
+                   for key in ("text", "universal_newlines", "encoding")):
+            lines = (line.encode() for line in lines)
+        yield from lines
+
 
 @dataclasses.dataclass
 class CapturedCommand:
@@ -185,6 +196,98 @@ class TestUtils(unittest.TestCase):
         self.assertIs(remove_prefix("foobar", prefix="bar", default="default"),
                       "default")
 
+    def test_git_commit_hash_full_hash(self):
+        """
+        Test that `gitutils.git_commit_hash` returns full commit hashes
+        without executing `git rev-parse`.
+        """
+        sha1_hash = "0123456789abcdef0123456789abcdef01234567"
+        sha256_hash = sha1_hash + "89abcdef0123456789abcdef"
+
+        def rev_parse_command_line(commitish):
+            return (f"git rev-parse --verify --quiet --end-of-options "
+                    f"{commitish} --")
+
+        fake_run_command = FakeRunCommand()
+        self.addCleanup(gitutils.invalidate_git_config_cache)
+        with unittest.mock.patch("gitutils.run_command", fake_run_command):
+            gitutils.invalidate_git_config_cache()
+            fake_run_command.set_fake_result("git config --list -z",
+                                             stdout=b"")
+            fake_run_command.set_fake_result(
+                rev_parse_command_line(sha256_hash),
+                return_code=128)
+            self.assertEqual(gitutils.git_commit_hash(sha1_hash), sha1_hash)
+            self.assertRaises(gitutils.CommitNotFoundError,
+                              gitutils.git_commit_hash, sha256_hash)
+
+            # In a SHA-256 repository, 40 hexadecimal digits are an
+            # abbreviation.
+            gitutils.invalidate_git_config_cache()
+            fake_run_command.set_fake_result(
+                "git config --list -z",
+                stdout=b"extensions.objectformat\nsha256\0")
+            fake_run_command.set_fake_result(
+                rev_parse_command_line(sha1_hash),
+                stdout=f"{sha256_hash}\n")
+            self.assertEqual(gitutils.git_commit_hash(sha256_hash),
+                             sha256_hash)
+            self.assertEqual(gitutils.git_commit_hash(sha1_hash), sha256_hash)
+
+    def test_get_git_config(self):
+        """Test that `gitutils.get_git_config` parses `git config` output."""
+        fake_run_command = FakeRunCommand()
+        fake_run_command.set_fake_result(
+            "git config --list -z",
+            stdout=(b"core.editor\nvim\0"
+                    b"user.name\nRen\xe9\0"
+                    b"branch.MyBranch.remote\norigin\0"
+                    b"foo.valueless\0"
+                    b"foo.yes\nyes\0"
+                    b"foo.on\nOn\0"
+                    b"foo.one\n1\0"
+                    b"foo.zero\n0\0"
+                    b"foo.empty\n\0"
+                    b"foo.bad\nmaybe\0"
+                    b"foo.repeated\nfirst\0"
+                    b"foo.repeated\nlast\0"))
+
+        get_git_config = gitutils.get_git_config
+        self.addCleanup(gitutils.invalidate_git_config_cache)
+        with unittest.mock.patch("gitutils.run_command", fake_run_command):
+            gitutils.invalidate_git_config_cache()
+
+            # Section and variable names are case-insensitive.
+            self.assertEqual(get_git_config("core", "editor"), "vim")
+            self.assertEqual(get_git_config("Core", "Editor"), "vim")
+
+            # Subsection names are case-sensitive.
+            self.assertEqual(get_git_config("Branch.MyBranch", "Remote"),
+                             "origin")
+            self.assertIs(get_git_config("branch.mybranch", "remote"), None)
+
+            self.assertEqual(get_git_config("core", "missing",
+                                            default="default"),
+                             "default")
+
+            self.assertIs(get_git_config("foo", "valueless", handler=bool),
+                          True)
+            self.assertEqual(get_git_config("foo", "valueless"), "")
+            self.assertIs(get_git_config("foo", "yes", handler=bool), True)
+            self.assertIs(get_git_config("foo", "on", handler=bool), True)
+            self.assertIs(get_git_config("foo", "one", handler=bool), True)
+            self.assertIs(get_git_config("foo", "zero", handler=bool), False)
+            self.assertIs(get_git_config("foo", "empty", handler=bool), False)
+            self.assertRaises(gitutils.AbortError,
+                              get_git_config, "foo", "bad", handler=bool)
+
+            self.assertEqual(get_git_config("foo", "repeated"), "last")
+
+            # Values that are not valid UTF-8 are decoded with surrogate
+            # escapes instead of failing.
+            self.assertEqual(get_git_config("user", "name"), "Ren\udce9")
+            self.assertEqual(get_git_config("foo", "one", handler=int), 1)
+
     def test_parse_known_options(self):
         """Tests `gitutils.parse_known_options`."""
 
@@ -402,6 +505,10 @@ class TestGitCommand(unittest.TestCase):
 
     def setUp(self):
         gitutils.run_command = self.fake_run_command
+        gitutils.stream_command = self.fake_run_command.stream
+        gitutils.exec_command \
+            = lambda args: self.fake_run_command(args).returncode
+        gitutils.invalidate_git_config_cache()
 
         def fake_git_commit_hash_action(command_line, match, result):
             result.stdout = match.group("commitish")
@@ -464,6 +571,12 @@ class TestGitHaveCommit(TestGitCommand):
         self.assertEqual(result.return_value, 0)
         self.assertEqual(result.stdout, "HEAD has commit parent.\n")
 
+    def test_same_commit(self):
+        """Test that a commit includes itself."""
+        result = call_with_io(self.run_have_commit("--leaf=child", "child"))
+        self.assertEqual(result.return_value, 0)
+        self.assertEqual(result.stdout, "child has commit child.\n")
+
 
 class TestGitPrevNext(TestGitCommand):
     """Tests for `git-prev` and `git-next`."""
@@ -486,37 +599,76 @@ class TestGitPrevNext(TestGitCommand):
         #                             child3b --- child3b1   \ leaf1
         #                                                     \
         #                                                      leaf2
-        commit_tree_string = ("leaf3\n"
-                              "leaf2\n"
-                              "leaf1\n"
-                              "child4 leaf3\n"
-                              "merge child4 leaf1 leaf2\n"
-                              "child3b1 merge\n"
-                              "child3a merge\n"
-                              "child3b child3b1\n"
-                              "child2 child3a child3b\n"
-                              "child1 child2\n"
-                              "initial child1\n")
-
-        self.fake_run_command.set_fake_result(
-            "git rev-parse --show-toplevel",
-            stdout="/dev/null")
+        #
+        # Listed in an order that `git rev-list --parents` could print, which
+        # is the reverse of the order of each commit's children.
+        commit_tree_string = ("leaf3 child4\n"
+                              "leaf2 merge\n"
+                              "leaf1 merge\n"
+                              "child4 merge\n"
+                              "merge child3a child3b1\n"
+                              "child3b1 child3b\n"
+                              "child3b child2\n"
+                              "child3a child2\n"
+                              "child2 child1\n"
+                              "child1 initial\n"
+                              "initial\n")
+
+        self.fake_run_command.set_fake_result("git rev-parse --git-dir")
 
         self.fake_run_command.set_fake_result(
-            "git rev-list --children --all",
+            "git rev-list --parents --all",
             stdout=commit_tree_string)
 
+        parent_hashes = {}
+        for line in commit_tree_string.splitlines():
+            (commit_hash, *parents) = line.split()
+            parent_hashes[commit_hash] = parents
+
+        def is_descendant(commit_hash, ancestor_hash):
+            """Returns whether `commit_hash` is a strict descendant."""
+            return any(parent == ancestor_hash
+                       or is_descendant(parent, ancestor_hash)
+                       for parent in parent_hashes[commit_hash])
+
+        def fake_git_parents_action(command_line, match, result):
+            result.stdout = "".join(
+                f"{parent}\n"
+                for parent in parent_hashes[match.group("commitish")])
+
         self.fake_run_command.set_fake_result_re(
-            r"git config --type=bool (prev|next).attach",
-            stdout="false")
+            r"git rev-parse --end-of-options '(?P<commitish>[^ ']+)\^@'$",
+            action=fake_git_parents_action)
+
+        # Like `git rev-list --ancestry-path`, report all descendants, not just
+        # the immediate children.
+        def fake_git_descendants_action(command_line, match, result):
+            ancestor_hash = match.group("commitish")
+            result.stdout = "".join(
+                f"{line}\n"
+                for line in commit_tree_string.splitlines()
+                if is_descendant(line.split()[0], ancestor_hash))
 
-        def fake_summarize_git_commit_action(command_line, match, result):
-            commitish = match.group("commitish")
-            result.stdout = f"{commitish} description"
+        self.fake_run_command.set_fake_result_re(
+            r"git rev-list --parents --ancestry-path --all "
+            r"'\^(?P<commitish>[^ ']+)' --",
+            action=fake_git_descendants_action)
+
+        self.fake_run_command.set_fake_result(
+            "git config --list -z",
+            stdout=b"prev.attach\nfalse\0next.attach\nfalse\0")
+
+        def fake_summarize_git_commits_action(command_line, match, result):
+            commit_hashes = match.group("commit_hashes").split()
+            result.stdout = "".join(f"{commit_hash}\x1f{commit_hash} "
+                                    f"description\0"
+                                    for commit_hash in commit_hashes)
 
         self.fake_run_command.set_fake_result_re(
-            r"git log --max-count=1 '--format=%h %s' (?P<commitish>.+)",
-            action=fake_summarize_git_commit_action)
+            r"git log --no-walk=unsorted -z --no-show-signature "
+            r"'--format=%H%x1f%h %s' "
+            r"(?P<commit_hashes>.+) --",
+            action=fake_summarize_git_commits_action)
 
     def test_graph(self):
         """
@@ -643,8 +795,8 @@ class TestGitSubmit(TestGitCommand):
         """
         Test that `git-submit` executes the expected `git commit` command.
         """
-        self.fake_run_command.set_fake_result(
-            "git config --type=bool submit.all", return_code=1)
+        self.fake_run_command.set_fake_result("git config --list -z",
+                                              stdout=b"")
 
         def make_fake_status(path, code):
             def fake_git_status(*paths, untracked_files="no"):